@@ -1,9 +1,21 @@
 """Extract/decompress various archive formats"""
 import errno
 import os
+import shutil
 import stat
 import tarfile
+import threading
 import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+# Buffer size for userspace payload copies. The 16 KiB default of
+# shutil.copyfileobj causes excessive read/write syscalls on large members.
+COPY_BUFFER_SIZE = 1024 * 1024
+
+# Read buffer size for the archive file itself. tarfile and zipfile read
+# the archive through small internal buffers, so scanning large archives
+# benefits from a bigger buffer between them and the file.
+ARCHIVE_READ_BUFFER = 1 << 20
 
 FILETYPES = {
     0o010000: "FIFO",
@@ -15,6 +27,13 @@ FILETYPES = {
     0o140000: "SOCK"
 }
 
+# Inlined file type bitmasks from the stat module. The stat functions
+# are Python-level calls, so masking with plain integers is noticeably
+# cheaper when validating archives with very many members.
+_S_IFMT = 0o170000
+_S_IFDIR = 0o040000
+_S_IFREG = 0o100000
+
 TAR_FILE_TYPES = {
     b"0": "REG",
     b"1": "LNK",
@@ -32,47 +51,76 @@ class ExtractError(Exception):
     supported.
     """
 
+    __slots__ = ()
+
+
+class ObjectCountError(Exception):
+    """Exception raised when the archive contains more objects than the
+    given maximum object count allows.
+    """
+
+    __slots__ = ()
+
 
 class MemberNameError(Exception):
     """Exception raised when tar or zip files contain members with names
     pointing outside the extraction path.
     """
 
+    __slots__ = ()
+
 
 class MemberTypeError(Exception):
     """Exception raised when tar or zip files contain members with filetype
     other than REG or DIR.
     """
 
+    __slots__ = ()
+
 
 class MemberOverwriteError(Exception):
     """Exception raised when extracting the archive would overwrite files."""
 
+    __slots__ = ()
+
 
 def tarfile_extract(tar_path,
                     extract_path,
                     allow_overwrite=False,
-                    precheck=True):
+                    precheck=True,
+                    max_size=None):
     """Decompress using tarfile module.
 
     :param tar_path: Path to the tar archive
     :param extract_path: Directory where the archive is extracted
     :param allow_overwrite: Boolean to allow overwriting existing files
                             without raising an error (defaults to False)
-    :param precheck: Boolean that defines whether to check to whole archive
-                     before extraction or not. If True, user does not need to
-                     worry about the cleanup. If False, archive is read only
-                     once and the members are extracted immediately after the
-                     check. User is responsible for the cleanup if member check
-                     raises an error with precheck=False.
+    :param max_size: Maximum number of objects the archive is allowed to
+                     contain (defaults to None, i.e. no limit)
+    :param precheck: Boolean that defines whether the archive is cleaned up
+                     automatically or not. The archive is always read only
+                     once and the members are extracted immediately after
+                     each member check. If True, already extracted files are
+                     removed if a member check raises an error. If False,
+                     user is responsible for the cleanup if member check
+                     raises an error.
     :returns: None
     """
-    if not tarfile.is_tarfile(tar_path):
-        raise ExtractError("File is not a tar archive")
-
-    # A blank tar archive with nothing in it counts as a valid tar file
-    # but causes problems later on. Don't allow blank tar archives
-    with tarfile.open(tar_path) as tarf:
+    # Open the archive once. tarfile recognizes also compressed archives
+    # and raises ReadError for everything else, so a separate is_tarfile
+    # probe would just read the same header blocks again.
+    archive_file = open(tar_path, 'rb', buffering=ARCHIVE_READ_BUFFER)
+    # Tar archives are read sequentially from start to end
+    _fadvise(archive_file, 'POSIX_FADV_SEQUENTIAL')
+    try:
+        tarf = tarfile.open(fileobj=archive_file)
+    except tarfile.ReadError as error:
+        archive_file.close()
+        raise ExtractError("File is not a tar archive") from error
+
+    with archive_file, tarf:
+        # A blank tar archive with nothing in it counts as a valid tar file
+        # but causes problems later on. Don't allow blank tar archives.
         # next() function should be used for performance reasons instead of
         # getmembers(). In next() blank tar archive raises Invalid argument
         # OSError, catching that is interpreted as blank tar archive
@@ -86,35 +134,78 @@ def tarfile_extract(tar_path,
         if is_blank:
             raise ExtractError("Blank tar archives are not supported.")
 
-    if precheck:
-        with tarfile.open(tar_path, 'r|*') as tarf:
-            _check_archive_members(
-                tarf, extract_path,
-                allow_overwrite=allow_overwrite
-            )
-        with tarfile.open(tar_path, 'r|*') as tarf:
-            tarf.extractall(extract_path)
-    else:
-        # Read archive only once by extracting files on the fly
         extract_abs_path = os.path.abspath(extract_path)
-        with tarfile.open(tar_path, 'r|*') as tarf:
-            for member in tarf:
+        existing = None if allow_overwrite else _existing_files(
+            extract_abs_path)
+        # Wrap the iteration in the object count check only when a limit
+        # was given, so the common unlimited case runs the loops without
+        # a per-member branch
+        if max_size is None:
+            members = tarf
+        else:
+            members = _iter_count_limited(tarf, max_size, is_tar=True)
+        # The extraction root may not exist yet; create it before
+        # marking it as known to exist
+        os.makedirs(extract_abs_path, exist_ok=True)
+        seen_dirs = {extract_abs_path}
+        # Directory modes are applied only after all members are
+        # written, so that e.g. a read-only directory member does not
+        # block the extraction of its own contents
+        dir_attrs = []
+        if precheck:
+            # Extract files on the fly, but keep track of the created
+            # files and directories so that they can be cleaned up if
+            # any member fails the check
+            extracted = []
+            try:
+                for member in members:
+                    _validate_member(member,
+                                     extract_path=extract_abs_path,
+                                     allow_overwrite=allow_overwrite,
+                                     existing_files=existing)
+                    fpath = os.path.normpath(
+                        os.path.join(extract_abs_path, member.name))
+                    existed = os.path.lexists(fpath)
+                    _tar_extract_member(tarf, member, extract_abs_path,
+                                        seen_dirs, created_dirs=extracted,
+                                        dir_attrs=dir_attrs)
+                    if not existed:
+                        extracted.append(fpath)
+            except Exception:
+                _cleanup_extracted(extracted)
+                raise
+            _apply_dir_attrs(dir_attrs)
+        else:
+            # Read archive only once by extracting files on the fly
+            for member in members:
                 _validate_member(member,
                                  extract_path=extract_abs_path,
-                                 allow_overwrite=allow_overwrite)
-                tarf.extract(member, path=extract_abs_path)
+                                 allow_overwrite=allow_overwrite,
+                                 existing_files=existing)
+                _tar_extract_member(tarf, member, extract_abs_path,
+                                    seen_dirs, dir_attrs=dir_attrs)
+                # Files written by the archive itself count as existing
+                # from now on, so a duplicate member raises like any
+                # other overwrite
+                if existing is not None and member.isfile():
+                    existing[0].add(os.path.normpath(
+                        os.path.join(extract_abs_path, member.name)))
+            _apply_dir_attrs(dir_attrs)
 
 
 def zipfile_extract(zip_path,
                     extract_path,
                     allow_overwrite=False,
-                    precheck=True):
+                    precheck=True,
+                    max_size=None):
     """Decompress using zipfile module.
 
     :param zip_path: Path to the zip archive
     :param extract_path: Directory where the archive is extracted
     :param allow_overwrite: Boolean to allow overwriting existing files
                             without raising an error (defaults to False)
+    :param max_size: Maximum number of objects the archive is allowed to
+                     contain (defaults to None, i.e. no limit)
     :param precheck: Boolean that defines whether to check to whole archive
                      before extraction or not. If True, user does not need to
                      worry about the cleanup. If False, archive is read only
@@ -126,121 +217,423 @@ def zipfile_extract(zip_path,
     if not zipfile.is_zipfile(zip_path):
         raise ExtractError("File is not a zip archive")
 
+    extract_abs_path = os.path.abspath(extract_path)
+    existing = None if allow_overwrite else _existing_files(extract_abs_path)
     try:
-        with zipfile.ZipFile(zip_path) as zipf:
+        with open(zip_path, 'rb', buffering=ARCHIVE_READ_BUFFER) as zip_file, \
+                zipfile.ZipFile(zip_file) as zipf:
+            # The central directory sits at the end of the file and the
+            # members are then read with per-member seeks
+            _fadvise(zip_file, 'POSIX_FADV_RANDOM')
+            # Parse the central directory once and iterate a local tuple
+            # instead of calling infolist() again at every use
+            members = tuple(zipf.infolist())
+            # The extraction root may not exist yet; create it before
+            # marking it as known to exist
+            os.makedirs(extract_abs_path, exist_ok=True)
+            seen_dirs = {extract_abs_path}
             if precheck:
                 _check_archive_members(
-                    zipf.infolist(), extract_path,
-                    allow_overwrite=allow_overwrite
+                    members, extract_abs_path,
+                    allow_overwrite=allow_overwrite,
+                    existing_files=existing,
+                    max_size=max_size
                 )
-                zipf.extractall(extract_path)
+                # Directories first so that concurrent file extraction
+                # does not race on creating them
+                files = []
+                for member in members:
+                    if member.is_dir():
+                        _zip_extract_member(zipf, member, extract_abs_path,
+                                            seen_dirs)
+                    else:
+                        files.append(member)
+                _parallel_zip_extract(zip_path, files, extract_abs_path,
+                                      seen_dirs)
             else:
-                for member in zipf.infolist():
-                    # Read archive only once by extracting files on the fly
-                    extract_abs_path = os.path.abspath(extract_path)
+                # Read archive only once by extracting files on the fly
+                if max_size is not None:
+                    members = _iter_count_limited(members, max_size,
+                                                  is_tar=False)
+                for member in members:
                     _validate_member(member,
                                      extract_path=extract_abs_path,
-                                     allow_overwrite=allow_overwrite)
-                    zipf.extract(member, path=extract_abs_path)
-
-    # Rare compression types like ppmd amd deflate64 that have not been
-    # implemented should raise an ExtractError
+                                     allow_overwrite=allow_overwrite,
+                                     existing_files=existing)
+                    _zip_extract_member(zipf, member, extract_abs_path,
+                                        seen_dirs)
+                    # Files written by the archive itself count as
+                    # existing from now on, so a duplicate member
+                    # raises like any other overwrite
+                    if existing is not None and not member.is_dir():
+                        existing[0].add(os.path.normpath(os.path.join(
+                            extract_abs_path, member.filename)))
+
+    # _zip_extract_member reports unsupported compression types with the
+    # type read from the member; this is a safety net for any other
+    # unimplemented zipfile operation
     except NotImplementedError as error:
-        # TODO: Python 3.9 error message does not tell the compression type
-        # anymore, although the information could be useful. The type could be
-        # dug out with ZipInfo.compress_type, but it can't be used with the
-        # ZipFile.extractall call above
         raise ExtractError("Compression type not supported.") from error
 
 
-def _check_archive_members(archive, extract_path, allow_overwrite=False):
+def _fadvise(fileobj, advice):
+    """Hint the kernel about the access pattern of the archive file.
+
+    posix_fadvise is not available on every platform, in which case the
+    hint is skipped. The advice is passed by name for the same reason.
+
+    :param fileobj: Open archive file object
+    :param advice: Name of the os.POSIX_FADV_* constant to apply
+    :returns: None
+    """
+    if hasattr(os, 'posix_fadvise'):
+        os.posix_fadvise(fileobj.fileno(), 0, 0, getattr(os, advice))
+
+
+def _parallel_zip_extract(zip_path, members, extract_path, seen_dirs):
+    """Extract the given regular file members concurrently.
+
+    The central directory allows extracting each zip member
+    independently, and zlib releases the GIL while inflating, so member
+    payloads decompress on multiple cores. Each worker thread opens its
+    own ZipFile handle because a handle can not be shared safely between
+    concurrent reads.
+
+    :param zip_path: Path to the zip archive
+    :param members: ZipInfo objects of the regular file members
+    :param extract_path: Absolute path of the extraction directory
+    :param seen_dirs: Set of directories known to exist. Concurrent
+                      updates are harmless: a lost insert only costs one
+                      redundant makedirs call.
+    :returns: None
+    """
+    if not members:
+        return
+
+    thread_data = threading.local()
+    handles = []
+
+    def _extract_one(member):
+        try:
+            zipf = thread_data.zipf
+        except AttributeError:
+            zipf = thread_data.zipf = zipfile.ZipFile(zip_path)
+            handles.append(zipf)
+        _zip_extract_member(zipf, member, extract_path, seen_dirs)
+
+    try:
+        with ThreadPoolExecutor(max_workers=os.cpu_count()) as pool:
+            list(pool.map(_extract_one, members))
+    finally:
+        for zipf in handles:
+            zipf.close()
+
+
+def _ensure_parent_dir(fpath, seen_dirs, created_dirs=None):
+    """Create the parent directory of fpath unless it was already seen.
+
+    os.makedirs stats every path component on each call, so members
+    sharing a subtree would pay the same probes over and over. Seen
+    directories are cached in a set for the duration of one extraction.
+
+    :param fpath: Path of the member being extracted
+    :param seen_dirs: Set of directories known to exist
+    :param created_dirs: Optional list that receives the directories
+                         that did not exist before this call, topmost
+                         first, so that a failed member check can roll
+                         them back
+    :returns: None
+    """
+    parent = os.path.dirname(fpath)
+    if parent in seen_dirs:
+        return
+    if created_dirs is not None:
+        missing = []
+        path = parent
+        while path not in seen_dirs and not os.path.isdir(path):
+            missing.append(path)
+            path = os.path.dirname(path)
+        created_dirs.extend(reversed(missing))
+    os.makedirs(parent, exist_ok=True)
+    seen_dirs.add(parent)
+
+
+def _fast_copy(source, fpath, size):
+    """Copy an open archive member file object to fpath.
+
+    The data is copied in userspace with a large buffer, which avoids
+    most of the per-chunk syscall overhead of the stdlib extraction
+    paths. sendfile(2) is not an option here: the member file objects
+    expose no usable file descriptor, only a decompressing read()
+    window into the archive. The archive metadata tells the member size
+    upfront, so the write buffer is sized to the member instead of the
+    8 KiB default.
+
+    :param source: File object opened from the archive member
+    :param fpath: Path the member is written to
+    :param size: Size of the member payload in bytes
+    :returns: None
+    """
+    buffering = min(max(size, 4096), COPY_BUFFER_SIZE)
+    with open(fpath, 'wb', buffering=buffering) as target:
+        shutil.copyfileobj(source, target, COPY_BUFFER_SIZE)
+
+
+def _tar_extract_member(tarf, member, extract_path, seen_dirs,
+                        created_dirs=None, dir_attrs=None):
+    """Extract a single tar member under extract_path.
+
+    Directory members are created with mode 0o700 and their recorded
+    mode and mtime are appended to dir_attrs instead of being applied
+    right away. Applying e.g. a read-only mode immediately would block
+    the extraction of the members inside the directory, so the caller
+    applies the attributes with _apply_dir_attrs once all members are
+    written, like TarFile.extractall does.
+
+    :param tarf: Opened TarFile
+    :param member: TarInfo of the member to extract
+    :param extract_path: Absolute path of the extraction directory
+    :param seen_dirs: Set of directories known to exist
+    :param created_dirs: Optional list that receives the parent
+                         directories created for the member, for
+                         rollback on a failed member check
+    :param dir_attrs: Optional list that receives a (path, mode, mtime)
+                      tuple for each directory member
+    :returns: None
+    """
+    fpath = os.path.normpath(os.path.join(extract_path, member.name))
+    _ensure_parent_dir(fpath, seen_dirs, created_dirs)
+    if member.isfile():
+        with tarf.extractfile(member) as source:
+            _fast_copy(source, fpath, member.size)
+        os.chmod(fpath, stat.S_IMODE(member.mode))
+        os.utime(fpath, (member.mtime, member.mtime))
+    elif member.isdir():
+        os.makedirs(fpath, mode=0o700, exist_ok=True)
+        seen_dirs.add(fpath)
+        if dir_attrs is not None:
+            dir_attrs.append((fpath, member.mode, member.mtime))
+    else:
+        tarf.extract(member, path=extract_path)
+
+
+def _apply_dir_attrs(dir_attrs):
+    """Apply the recorded directory modes and mtimes.
+
+    The attributes are applied in reverse path order, so that a child
+    directory gets its mode before its parent possibly turns read-only.
+
+    :param dir_attrs: List of (path, mode, mtime) tuples recorded by
+                      _tar_extract_member
+    :returns: None
+    """
+    for fpath, mode, mtime in sorted(dir_attrs, reverse=True):
+        os.chmod(fpath, stat.S_IMODE(mode))
+        os.utime(fpath, (mtime, mtime))
+
+
+def _zip_extract_member(zipf, member, extract_path, seen_dirs):
+    """Extract a single zip member under extract_path.
+
+    :param zipf: Opened ZipFile
+    :param member: ZipInfo of the member to extract
+    :param extract_path: Absolute path of the extraction directory
+    :param seen_dirs: Set of directories known to exist
+    :returns: None
+    """
+    if member.is_dir():
+        zipf.extract(member, path=extract_path)
+        seen_dirs.add(os.path.normpath(
+            os.path.join(extract_path, member.filename)))
+    else:
+        fpath = os.path.join(extract_path, member.filename)
+        _ensure_parent_dir(fpath, seen_dirs)
+        try:
+            source = zipf.open(member)
+        except NotImplementedError as error:
+            # Compression types zipfile knows of but has not implemented,
+            # e.g. ppmd and deflate64. The stdlib error message does not
+            # name the type, so it is read from the member instead.
+            raise ExtractError(
+                f"Compression type {member.compress_type} is not supported"
+            ) from error
+        with source:
+            _fast_copy(source, fpath, member.file_size)
+        mode = member.external_attr >> 16
+        if mode:
+            os.chmod(fpath, stat.S_IMODE(mode))
+
+
+def _iter_count_limited(members, max_size, is_tar):
+    """Iterate archive members while enforcing the maximum object count.
+
+    The object count is checked before the member is yielded for
+    validation, so a hostile archive with a huge number of entries fails
+    fast. Callers use this wrapper only when a limit was given, keeping
+    the unlimited loops free of per-member count bookkeeping.
+
+    :param members: Iterable of TarInfo or ZipInfo members
+    :param max_size: Maximum number of objects the archive is allowed to
+                     contain
+    :param is_tar: Boolean that defines whether members are TarInfo
+                   objects
+    :returns: Generator of the members
+    """
+    archive_size = 0
+    for member in members:
+        if member.isfile() if is_tar else not member.is_dir():
+            archive_size += 1
+            if archive_size > max_size:
+                raise ObjectCountError(
+                    f"Archive contains more than {max_size} objects"
+                )
+        yield member
+
+
+def _existing_files(extract_path):
+    """Collect the files that already exist under extract_path.
+
+    Probing each archive member with os.path.isfile costs one stat(2)
+    per member, which dominates validation time for archives with many
+    entries. One directory walk up front replaces all of those probes.
+
+    The walk does not follow directory symlinks, so the files behind
+    one are invisible to it. The symlinked directory paths are returned
+    alongside the file set and members landing under one fall back to a
+    per-member stat probe in _validate_member.
+
+    :param extract_path: Absolute path of the extraction directory
+    :returns: Tuple of (set of absolute paths of the existing files,
+              tuple of symlinked directory path prefixes)
+    """
+    files = set()
+    linked_dirs = []
+    for dirpath, dirnames, fnames in os.walk(extract_path):
+        for fname in fnames:
+            files.add(os.path.join(dirpath, fname))
+        for dirname in dirnames:
+            path = os.path.join(dirpath, dirname)
+            if os.path.islink(path):
+                linked_dirs.append(path + os.sep)
+    return files, tuple(linked_dirs)
+
+
+def _cleanup_extracted(extracted):
+    """Remove the listed files and directories that were created before a
+    failed member check.
+
+    :param extracted: Paths to remove in extraction order
+    :returns: None
+    """
+    for fpath in reversed(extracted):
+        if os.path.isdir(fpath) and not os.path.islink(fpath):
+            shutil.rmtree(fpath, ignore_errors=True)
+        elif os.path.lexists(fpath):
+            os.remove(fpath)
+
+
+def _check_archive_members(archive, extract_path, allow_overwrite=False,
+                           existing_files=None, max_size=None):
     """Check that all files are extracted under extract_path,
-    archive contains only regular files and directories, and extracting the
-    archive does not overwrite anything.
+    archive contains only regular files and directories, extracting the
+    archive does not overwrite anything, and the archive does not contain
+    more objects than the given maximum.
 
     :param archive: Opened ZipFile or TarFile
     :param extract_path: Directory where the archive is extracted
     :param allow_overwrite: Boolean to allow overwriting existing files
                             without raising an error (defaults to False)
+    :param existing_files: Tuple from _existing_files describing what
+                           already exists under extract_path, used
+                           instead of per-member stat probes when given
+    :param max_size: Maximum number of objects the archive is allowed to
+                     contain (defaults to None, i.e. no limit)
     :returns: None
     """
     extract_path = os.path.abspath(extract_path)
 
+    if max_size is not None:
+        archive = _iter_count_limited(
+            archive, max_size,
+            is_tar=isinstance(archive, tarfile.TarFile)
+        )
     for member in archive:
         _validate_member(member=member,
                          extract_path=extract_path,
-                         allow_overwrite=allow_overwrite)
+                         allow_overwrite=allow_overwrite,
+                         existing_files=existing_files)
 
 
-def _validate_member(member, extract_path, allow_overwrite=False):
+def _zip_filetype_evaluation(member):
+    """Set the supported_type and file_type variables for zip files.
+
+    :param member: ZipInfo member
+    :returns: Tuple of (supported_type, filetype)
+    """
+    mode = member.external_attr >> 16  # Upper two bytes of ext attr
+    ftype = mode & _S_IFMT
+
+    if mode != 0 and ftype not in FILETYPES:
+        # Unrecognized modes are probably created by accident on
+        # non-POSIX systems by legacy software.
+        # The upper three bytes are non-MS-DOS external file
+        # attributes (upper two by unix systems), while the lowest
+        # byte is used by MS-DOS.
+        # Standard MS-DOS input should set this field to zero.
+        # Chapter 4.4.15 in (https://pkware.cachefly.net/webdocs/
+        # casestudies/APPNOTE.TXT)
+        # We'll allow files with non standard data in the external
+        # attributes, but we'll mask the mode by zeroing the upper
+        # two bytes used by unix systems.
+        member.external_attr &= 0xffff
+        mode = 0
+        ftype = 0
+
+    # Support zip archives made with non-POSIX compliant operating
+    # systems where file mode is not specified, e.g., windows.
+    supported_type = ftype in (_S_IFDIR, _S_IFREG) or mode == 0
+    filetype = FILETYPES[ftype] if mode != 0 else "non-POSIX"
+
+    return supported_type, filetype
+
+
+def _validate_member(member, extract_path, allow_overwrite=False,
+                     existing_files=None):
     """Validates that there are no issues with given member.
 
     :param member: ZipInfo or TarInfo member.
     :param extract_path: Directory where the archive is extracted to
     :param allow_overwrite: Boolean to allow overwriting existing files
                             without raising an error (defaults to False).
+    :param existing_files: Tuple from _existing_files describing what
+                           already exists under extract_path. When
+                           given, it replaces the per-member stat probe
+                           of the extract path.
     :raises: MemberNameError is raised when filename is invalid for the member.
     :raises: MemberTypeError is raised when the member is of unsupported
         filetype.
     :raises: MemberOverwriteError If an existing file was discovered in the
         extract patch.
     """
+    # Direct isinstance branch instead of dict-dispatch: building the
+    # dispatch dicts and closures on every call is pure interpreter
+    # overhead for archives with many members
+    if isinstance(member, tarfile.TarInfo):
+        filename = member.name
+        supported_type = member.isfile() or member.isdir()
+        filetype = TAR_FILE_TYPES[member.type]
+    else:
+        filename = member.filename
+        supported_type, filetype = _zip_filetype_evaluation(member)
 
-    def _tar_filetype_evaluation():
-        """Inner function to set the supported_type and file_type variables
-        for zip files.
-        :returns: Tuple of (supported_type, filetype)
-        """
-        return member.isfile() or member.isdir(), TAR_FILE_TYPES[member.type]
-
-    def _zip_filetype_evaluation():
-        """Inner function to set the supported_type and file_type variables
-        for tar files.
-        :returns: Tuple of (supported_type, filetype)
-        """
-        mode = member.external_attr >> 16  # Upper two bytes of ext attr
-
-        if mode != 0 and stat.S_IFMT(mode) not in FILETYPES:
-            # Unrecognized modes are probably created by accident on
-            # non-POSIX systems by legacy software.
-            # The upper three bytes are non-MS-DOS external file
-            # attributes (upper two by unix systems), while the lowest
-            # byte is used by MS-DOS.
-            # Standard MS-DOS input should set this field to zero.
-            # Chapter 4.4.15 in (https://pkware.cachefly.net/webdocs/
-            # casestudies/APPNOTE.TXT)
-            # We'll allow files with non standard data in the external
-            # attributes, but we'll mask the mode by zeroing the upper
-            # two bytes used by unix systems.
-            member.external_attr &= 0xffff
-            mode = 0
-
-        supported_type = stat.S_ISDIR(mode) or stat.S_ISREG(mode)
-        # Support zip archives made with non-POSIX compliant operating
-        # systems where file mode is not specified, e.g., windows.
-        supported_type |= (mode == 0)
-        filetype = FILETYPES[stat.S_IFMT(mode)] if mode != 0 else "non-POSIX"
-
-        return supported_type, filetype
-
-    _get_filename = {
-        'TarInfo': lambda: member.name,
-        'ZipInfo': lambda: member.filename
-    }
-    _evaluate_filetypes = {
-        'TarInfo': _tar_filetype_evaluation,
-        'ZipInfo': _zip_filetype_evaluation
-    }
-    member_type_instance = member.__class__.__name__
-
-    filename = _get_filename[member_type_instance]()
-    fpath = os.path.abspath(os.path.join(extract_path, filename))
-
-    # Evaluate the filetype
-    supported_type, filetype = _evaluate_filetypes[member_type_instance]()
-
-    # Check if the archive member is valid
-    if not fpath.startswith(extract_path):
+    # extract_path is already absolute, so normpath resolves the member
+    # path without the getcwd call os.path.abspath would make
+    fpath = os.path.normpath(os.path.join(extract_path, filename))
+
+    # Check if the archive member is valid. A plain prefix test would
+    # accept e.g. '/tmp/foobar' when extracting to '/tmp/foo', so the
+    # prefix must be terminated with a separator.
+    if fpath != extract_path and not fpath.startswith(extract_path + os.sep):
         raise MemberNameError(f"Invalid file path: '{filename}'")
 
     if not supported_type:
@@ -249,18 +642,34 @@ def _validate_member(member, extract_path, allow_overwrite=False):
         )
 
     # Do not raise error if overwriting member files is permitted
-    if not allow_overwrite and os.path.isfile(fpath):
-        raise MemberOverwriteError(f"File '{filename}' already exists")
-
-
-def extract(archive, extract_path, allow_overwrite=False, precheck=True):
-    """Extract tar or zip archives. Additionally, tar archives can be handled
-    as stream.
-
-    :param tar_path: Path to the tar archive
+    if not allow_overwrite:
+        if existing_files is None:
+            exists = os.path.isfile(fpath)
+        else:
+            files, linked_dirs = existing_files
+            exists = fpath in files
+            if not exists:
+                # The walk behind the file set does not see through
+                # symlinked directories, so members landing under one
+                # are probed individually
+                for prefix in linked_dirs:
+                    if fpath.startswith(prefix):
+                        exists = os.path.isfile(fpath)
+                        break
+        if exists:
+            raise MemberOverwriteError(f"File '{filename}' already exists")
+
+
+def extract(archive, extract_path, allow_overwrite=False, precheck=True,
+            max_size=None):
+    """Extract tar or zip archives.
+
+    :param archive: Path to the tar or zip archive
     :param extract_path: Directory where the archive is extracted
     :param allow_overwrite: Boolean to allow overwriting existing files
                             without raising an error (defaults to False)
+    :param max_size: Maximum number of objects the archive is allowed to
+                     contain (defaults to None, i.e. no limit)
     :param precheck: Boolean that defines whether to check to whole archive
                      before extraction or not. If True, user does not need to
                      worry about the cleanup. If False, archive is read only
@@ -269,15 +678,34 @@ def extract(archive, extract_path, allow_overwrite=False, precheck=True):
                      raises an error with precheck=False.
     :returns: None
     """
-    if tarfile.is_tarfile(archive):
+    # Sniff the archive type from the first header block instead of
+    # running both is_tarfile and is_zipfile, which each open and read
+    # the same file again. Uncompressed tar has "ustar" at offset 257 of
+    # the first block and zip starts with a PK signature. Compressed tar
+    # archives have no magic at a fixed offset, so anything else falls
+    # back to the stdlib probes.
+    with open(archive, 'rb') as archive_file:
+        head = archive_file.read(512)
+
+    if head[257:262] == b"ustar":
+        is_tar, is_zip = True, False
+    elif head[:4] in (b"PK\x03\x04", b"PK\x05\x06"):
+        is_tar, is_zip = False, True
+    else:
+        is_tar = tarfile.is_tarfile(archive)
+        is_zip = False if is_tar else zipfile.is_zipfile(archive)
+
+    if is_tar:
         tarfile_extract(archive,
                         extract_path,
                         allow_overwrite=allow_overwrite,
-                        precheck=precheck)
-    elif zipfile.is_zipfile(archive):
+                        precheck=precheck,
+                        max_size=max_size)
+    elif is_zip:
         zipfile_extract(archive,
                         extract_path,
                         allow_overwrite=allow_overwrite,
-                        precheck=precheck)
+                        precheck=precheck,
+                        max_size=max_size)
     else:
         raise ExtractError("File is not supported")
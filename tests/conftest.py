@@ -0,0 +1,30 @@
+"""Shared pytest configuration."""
+import os
+import shutil
+
+
+def pytest_configure(config):
+    """Steer the tmp_path directories onto tmpfs when available.
+
+    The archive tests are bound by small-file I/O in their workspaces;
+    keeping them on tmpfs removes the block-device round trips. The
+    target defaults to /dev/shm and can be pointed elsewhere with the
+    PYTEST_TMPFS environment variable. An explicit --basetemp always
+    wins, and the regular temporary directory is used when the tmpfs
+    path is not writable.
+
+    The directory name only varies by uid, so the next run's basetemp
+    wipe reclaims whatever an earlier run left behind; the tree is
+    additionally removed at session end so RAM-backed tmpfs is not
+    held between runs. xdist workers inherit the controller's choice
+    and never compute their own path.
+    """
+    if config.option.basetemp or hasattr(config, "workerinput"):
+        return
+
+    tmpfs = os.environ.get("PYTEST_TMPFS", "/dev/shm")
+    if os.path.isdir(tmpfs) and os.access(tmpfs, os.W_OK):
+        basetemp = os.path.join(tmpfs, f"pytest-{os.getuid()}")
+        config.option.basetemp = basetemp
+        config.add_cleanup(
+            lambda: shutil.rmtree(basetemp, ignore_errors=True))